@@ -10,28 +10,412 @@ A script that:
    or clearly mismatched, with explicit caution prompts to reduce accidental "yes."
 
 Usage:
-  python complete_script.py "/path/to/A Plus D - Best of Bootie Mashup 2024"
+  python complete_script.py "/path/to/A Plus D - Best of Bootie Mashup 2024" [more/album/dirs ...]
 """
 
 import os
 import sys
 import argparse
+import functools
+import gzip
+import hashlib
+import http.client
+import io
+import json
+import logging
 import re
-import platform
-import subprocess
-from urllib.parse import urlencode, quote_plus
-
-import musicbrainzngs
-from mutagen import File as MutagenFile
+import random
+import sqlite3
+import struct
+import threading
+import time
+import webbrowser
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+from operator import attrgetter, itemgetter
+from urllib.error import HTTPError
+from urllib.parse import urlencode, urlsplit, quote_plus
+from urllib.request import getproxies
+
+from mutagen import File as MutagenFile, MutagenError
+from mutagen.flac import FLAC
+from mutagen.easyid3 import EasyID3
+from mutagen.id3 import ID3NoHeaderError
+from mutagen.easymp4 import EasyMP4
+from mutagen.oggflac import OggFLAC
+from mutagen.oggopus import OggOpus
+from mutagen.oggspeex import OggSpeex
+from mutagen.oggvorbis import OggVorbis
+from mutagen.wave import WAVE
+
+log = logging.getLogger("musakbrainz")
 
 # ---------------------------------------------------------------------------
 # 1) MusicBrainz Setup
 # ---------------------------------------------------------------------------
-musicbrainzngs.set_useragent(
-    "MusicBrainzSideBySideDiff",
-    "0.1",
-    "https://example.org/my-musicbrainz-app"
-)
+_musicbrainzngs = None
+_musicbrainzngs_lock = threading.Lock()
+
+
+class KeepAliveOpener:
+    """
+    Drop-in for the urllib opener musicbrainzngs builds on every request.
+    urllib sends "Connection: close", so each MB call paid a fresh TCP+TLS
+    handshake; this keeps a small pool of persistent HTTP(S) connections.
+    Error statuses are raised as urllib HTTPErrors so musicbrainzngs'
+    _safe_read still classifies and retries them as before. Redirects are
+    replayed through a regular urllib opener from `fallback`, which follows
+    them. Responses are requested gzipped; MB's XML compresses roughly tenfold.
+    """
+
+    def __init__(self, fallback, timeout=30):
+        self.fallback = fallback
+        self.timeout = timeout
+        self._idle = []  # [((scheme, host), connection)]
+        self._lock = threading.Lock()
+
+    def _checkout(self, key):
+        with self._lock:
+            for i, (idle_key, conn) in enumerate(self._idle):
+                if idle_key == key:
+                    del self._idle[i]
+                    return conn, True
+        scheme, host = key
+        conn_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return conn_class(host, timeout=self.timeout), False
+
+    def _checkin(self, key, conn):
+        with self._lock:
+            self._idle.append((key, conn))
+
+    def open(self, req, data=None):
+        url = urlsplit(req.full_url)
+        key = (url.scheme, url.netloc)
+        path = f"{url.path}?{url.query}" if url.query else url.path
+        body = data if data is not None else req.data
+        while True:
+            conn, reused = self._checkout(key)
+            try:
+                headers = dict(req.header_items())
+                headers["Accept-Encoding"] = "gzip"
+                conn.request(req.get_method(), path, body=body, headers=headers)
+                resp = conn.getresponse()
+                payload = resp.read()
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                if reused:
+                    # The server dropped an idle connection; retry on a fresh one
+                    continue
+                raise
+            break
+
+        if resp.will_close:
+            conn.close()
+        else:
+            self._checkin(key, conn)
+        if 300 <= resp.status < 400:
+            return self.fallback().open(req, data)
+        if (resp.getheader("Content-Encoding") or "").strip().lower() == "gzip":
+            try:
+                payload = gzip.decompress(payload)
+            except (EOFError, zlib.error, gzip.BadGzipFile) as exc:
+                # A truncated/corrupt body is a transport failure: surface it as
+                # one so _safe_read wraps it in NetworkError and MBClient retries
+                raise http.client.IncompleteRead(payload) from exc
+        if resp.status >= 400:
+            raise HTTPError(req.full_url, resp.status, resp.reason, resp.msg, io.BytesIO(payload))
+        return io.BytesIO(payload)
+
+
+def get_musicbrainzngs():
+    """
+    Import and configure musicbrainzngs on first use. It pulls in an XML
+    stack we don't need for --help or for albums that never reach a lookup.
+    """
+    global _musicbrainzngs
+    with _musicbrainzngs_lock:
+        if _musicbrainzngs is None:
+            import musicbrainzngs
+            musicbrainzngs.set_useragent(
+                "MusicBrainzSideBySideDiff",
+                "0.1",
+                "https://example.org/my-musicbrainz-app"
+            )
+            # musicbrainzngs' own limiter allows 1 req/s and holds a global lock
+            # for the whole HTTP round-trip. Unwrap it; MBClient paces dispatch.
+            mb_request = musicbrainzngs.musicbrainz._mb_request
+            musicbrainzngs.musicbrainz._mb_request = getattr(mb_request, "fun", mb_request)
+            # It also builds a fresh urllib opener per request. Hand it the
+            # keep-alive one instead, unless auth handlers are involved or a
+            # proxy is configured: those need urllib's full handler chain.
+            compat = musicbrainzngs.musicbrainz.compat
+            build_opener = compat.build_opener
+            keep_alive = KeepAliveOpener(fallback=build_opener)
+
+            def pick_opener(*handlers):
+                if len(handlers) == 1 and not getproxies():
+                    return keep_alive
+                return build_opener(*handlers)
+
+            compat.build_opener = pick_opener
+            # And it retries 5xx responses itself, 8 times with growing sleeps,
+            # bypassing our limiter and ignoring Retry-After. One attempt per
+            # call here; MBClient._call is the only retry policy.
+            musicbrainzngs.musicbrainz._safe_read = functools.partial(
+                musicbrainzngs.musicbrainz._safe_read, max_retries=1
+            )
+            _musicbrainzngs = musicbrainzngs
+        return _musicbrainzngs
+
+
+class SlidingWindowLimiter:
+    """
+    Thread-safe dispatch limiter: at most `max_calls` calls in any `window`
+    seconds. Only acquire() is serialized; the HTTP round-trips that follow
+    overlap freely. Unlike a token bucket, a full burst can't be followed by
+    a second one as tokens trickle back, so MB's average rate holds over
+    every window.
+    """
+
+    def __init__(self, max_calls, window):
+        self.max_calls = max_calls
+        self.window = window
+        self.sent = deque()  # monotonic dispatch times, oldest first
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            while True:
+                now = time.monotonic()
+                while self.sent and self.sent[0] <= now - self.window:
+                    self.sent.popleft()
+                if len(self.sent) < self.max_calls:
+                    self.sent.append(now)
+                    return
+                time.sleep(self.sent[0] + self.window - now)
+
+
+MB_MAX_ATTEMPTS = 5
+MB_MAX_BACKOFF_SECONDS = 30.0
+
+
+def _retry_after_seconds(exc):
+    """Seconds from a Retry-After header on the HTTP error behind exc, if any."""
+    headers = getattr(getattr(exc, "cause", None), "headers", None)
+    value = headers.get("Retry-After") if headers is not None else None
+    if value and value.strip().isdigit():
+        return float(value)
+    return None
+
+
+class MBClient:
+    """
+    Every MusicBrainz web-service call goes through here and passes the rate limiter first.
+    Network failures and 5xx responses (musicbrainzngs raises both as
+    NetworkError) are retried with exponential backoff plus jitter, honouring
+    Retry-After. Each retry takes a fresh limiter slot.
+    """
+
+    def __init__(self, limiter, max_in_flight):
+        self.limiter = limiter
+        # Thread pools nest (albums x releases), so the in-flight cap lives here
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    def _call(self, func, *args, **kwargs):
+        mb = get_musicbrainzngs()
+        for attempt in range(1, MB_MAX_ATTEMPTS + 1):
+            try:
+                with self.in_flight:
+                    self.limiter.acquire()
+                    return func(mb, *args, **kwargs)
+            except mb.NetworkError as exc:
+                if attempt == MB_MAX_ATTEMPTS:
+                    raise
+                delay = _retry_after_seconds(exc)
+                if delay is None:
+                    delay = min(MB_MAX_BACKOFF_SECONDS, 2.0 ** (attempt - 1)) + random.uniform(0, 1)
+                log.warning("MusicBrainz request failed (%s); retry %d/%d in %.1fs",
+                            exc, attempt, MB_MAX_ATTEMPTS - 1, delay)
+                time.sleep(delay)
+
+    def search_releases(self, **fields):
+        return self._call(lambda mb: mb.search_releases(**fields))
+
+    def get_release_by_id(self, release_id, includes=()):
+        return self._call(lambda mb: mb.get_release_by_id(release_id, includes=list(includes)))
+
+
+# Requests in flight at once, enforced by MBClient across all threads. Enough
+# to overlap MB's server-side latency within the rate limit, few enough that
+# KeepAliveOpener reuses a handful of connections rather than opening one TLS
+# session per thread. Also sizes the lookup thread pools.
+MB_MAX_CONCURRENCY = 4
+
+# Bursts of up to 10 requests per 10 seconds, which averages out to MB's 1 req/s.
+mb_client = MBClient(SlidingWindowLimiter(max_calls=10, window=10.0), max_in_flight=MB_MAX_CONCURRENCY)
+
+RELEASE_INCLUDES = ("artist-credits", "recordings", "release-groups", "labels", "url-rels")
+
+# Responses are cached on disk so re-running against the same album doesn't
+# pay MusicBrainz's ~1 req/s rate limit again. Empty search results expire
+# sooner, since the missing release may be added on MB in the meantime.
+CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+CACHE_NEGATIVE_TTL_SECONDS = 24 * 60 * 60
+
+
+def default_cache_path():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "musakbrainz", "mb.sqlite")
+
+
+class ResponseCache:
+    """
+    Minimal SQLite key/value store for JSON-serializable MB responses.
+    Each row carries its own expiry (``ttl`` seconds unless set() is given
+    one). If the database can't be opened, the cache silently degrades to
+    a no-op.
+    """
+
+    def __init__(self, path, ttl=CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, expires REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            self._conn.commit()
+        except (OSError, sqlite3.Error):
+            self._conn = None
+
+    def get(self, key):
+        if self._conn is None:
+            return None
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT expires, value FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+        if row is None or row[0] < time.time():
+            return None
+        return json.loads(row[1])
+
+    def set(self, key, value, ttl=None):
+        if self._conn is None:
+            return
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, expires, value) VALUES (?, ?, ?)",
+                    (key, time.time() + ttl, json.dumps(value)),
+                )
+                self._conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def delete(self, *keys):
+        if self._conn is None:
+            return
+        with self._lock:
+            try:
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k in keys])
+                self._conn.commit()
+            except sqlite3.Error:
+                pass
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(default_cache_path())
+        return _response_cache
+
+
+def disable_response_cache():
+    """Swap in a no-op cache so every MB call goes to the network (--no-cache)."""
+    global _response_cache
+    with _response_cache_lock:
+        _response_cache = ResponseCache(None)
+
+
+def _cache_key(*parts):
+    return hashlib.sha1("\x00".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def _normalize_query(text):
+    """MB search is case- and whitespace-insensitive, so the cache key is too."""
+    return " ".join((text or "").split()).casefold()
+
+
+def _search_cache_key(artist_name, album_name):
+    return _cache_key("search_releases", _normalize_query(artist_name), _normalize_query(album_name))
+
+
+def _release_cache_key(release_id, includes):
+    return _cache_key("get_release_by_id", release_id, *includes)
+
+
+@functools.lru_cache(maxsize=None)
+def mb_search_releases(artist_name, album_name):
+    """Cached musicbrainzngs.search_releases for an (artist, album) pair."""
+    cache = get_response_cache()
+    key = _search_cache_key(artist_name, album_name)
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    if not artist_name:
+        result = mb_client.search_releases(release=album_name, limit=10)
+    else:
+        result = mb_client.search_releases(artist=artist_name, release=album_name, limit=10)
+    if result.get('release-list'):
+        cache.set(key, result)
+    else:
+        cache.set(key, result, min(CACHE_NEGATIVE_TTL_SECONDS, cache.ttl))
+    return result
+
+
+@functools.lru_cache(maxsize=None)
+def mb_get_release(release_id, includes=RELEASE_INCLUDES):
+    """Cached musicbrainzngs.get_release_by_id, keyed by release MBID + includes."""
+    cache = get_response_cache()
+    key = _release_cache_key(release_id, includes)
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    result = mb_client.get_release_by_id(release_id, includes=includes)
+    cache.set(key, result)
+    return result
+
+
+def forget_cached_lookups(artist_name, album_name, release_id=None):
+    """
+    Drop the cached search (and release) for an album. Called whenever we send
+    the user off to edit MB, so the re-run they'll do afterwards sees the edit.
+    """
+    keys = [_search_cache_key(artist_name, album_name)]
+    if release_id:
+        keys.append(_release_cache_key(release_id, RELEASE_INCLUDES))
+    get_response_cache().delete(*keys)
+    mb_search_releases.cache_clear()
+    mb_get_release.cache_clear()
 
 
 # ---------------------------------------------------------------------------
@@ -41,8 +425,35 @@ def parse_args():
     parser = argparse.ArgumentParser(
         description="Recursively gather local tracks, produce a side-by-side diff vs. MusicBrainz, matching the best release group by track count."
     )
-    parser.add_argument("root_directory", help="Root directory of the album (subfolders included).")
-    return parser.parse_args()
+    parser.add_argument(
+        "root_directories", nargs="+", metavar="root_directory",
+        help="Root directory of the album (subfolders included). Pass several to look them up in one run."
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="Emit debug logging to stderr.")
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Bypass the on-disk MusicBrainz response cache (neither read nor written)."
+    )
+    parser.add_argument(
+        "--cache-ttl", type=float, default=CACHE_TTL_SECONDS / 86400, metavar="DAYS",
+        help="How long newly cached MusicBrainz responses stay fresh (default: %(default)g days)."
+    )
+    parser.add_argument(
+        "--scan-workers", type=int, default=None, metavar="N",
+        help="Tag-reading concurrency (default: 4 per CPU). Use 1 on spinning disks."
+    )
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="Never prompt: print one OK/AMBIG/MISS/ERROR line per album instead of diffs, "
+             "and exit nonzero unless every album has a single exact track-count match."
+    )
+    args = parser.parse_args()
+    # NaN fails every comparison, so it is rejected here as well
+    if not 0 < args.cache_ttl < float("inf"):
+        parser.error("--cache-ttl must be a positive number of days")
+    if args.scan_workers is not None and args.scan_workers < 1:
+        parser.error("--scan-workers must be at least 1")
+    return args
 
 
 def prompt_yes_no(message):
@@ -57,24 +468,27 @@ def prompt_yes_no(message):
 
 def open_in_browser(url):
     """
-    Cross-platform way to open a URL in the user’s default browser:
-      - macOS:   'open <url>'
-      - Linux:   'xdg-open <url>'
-      - Windows: 'start <url>'
+    Open a URL in the user's default browser (new tab where supported).
+    webbrowser picks the platform mechanism itself (LaunchServices on macOS,
+    os.startfile on Windows, the first available opener on Linux).
+    Callers print the URL first, so nothing is lost if no browser is found.
     """
-    system = platform.system().lower()
-    if 'darwin' in system:  # macOS
-        subprocess.run(['open', url])
-    elif 'windows' in system:
-        subprocess.run(['start', url], shell=True)
-    else:  # linux / other
-        subprocess.run(['xdg-open', url])
+    webbrowser.open(url, new=2)
 
 
 # ---------------------------------------------------------------------------
 # 3) Local File Gathering
 # ---------------------------------------------------------------------------
-VALID_AUDIO_EXTENSIONS = {".mp3", ".flac", ".wav", ".m4a", ".ogg"}
+# A tuple so it can go straight to str.endswith()
+VALID_AUDIO_EXTENSIONS = (".mp3", ".flac", ".wav", ".m4a", ".ogg")
+
+# Anything smaller is a placeholder (interrupted copy, AppleDouble fork...),
+# not audio worth opening.
+MIN_AUDIO_FILE_SIZE = 1024
+
+TAG_READ_BUFFER_SIZE = 64 * 1024
+
+_ARTIST_ALBUM_RE = re.compile(r"^(.*?)\s*-\s*(.*)$")
 
 
 def guess_artist_and_album_from_directory(dir_name):
@@ -82,8 +496,7 @@ def guess_artist_and_album_from_directory(dir_name):
     Naive approach: parse "Artist - Album" from the directory name.
     If that fails, treat entire name as album.
     """
-    pattern = r"^(.*?)\s*-\s*(.*)$"
-    match = re.match(pattern, dir_name)
+    match = _ARTIST_ALBUM_RE.match(dir_name)
     if match:
         artist, album = match.groups()
         return artist.strip(), album.strip()
@@ -91,15 +504,276 @@ def guess_artist_and_album_from_directory(dir_name):
 
 
 def find_audio_files_recursively(root_directory):
-    for dirpath, dirnames, filenames in os.walk(root_directory):
-        # Skip hidden directories
-        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
-        for fname in sorted(filenames):
-            if fname.startswith('.'):
-                continue
-            ext = os.path.splitext(fname.lower())[1]
-            if ext in VALID_AUDIO_EXTENSIONS:
-                yield os.path.join(dirpath, fname)
+    """
+    Yield (path, filename, subdir) for audio files under root_directory,
+    skipping hidden entries. subdir is relative to root_directory ("" at the
+    top) and is carried down the walk, so callers never re-split paths.
+    Uses an explicit stack of os.scandir() calls so DirEntry type info and
+    paths are reused instead of re-stat'ing/re-joining. Order is unspecified;
+    callers sort as needed.
+    """
+    pending = [(root_directory, "")]
+    while pending:
+        dir_path, subdir = pending.pop()
+        try:
+            entries = os.scandir(dir_path)
+        except OSError as exc:
+            # Missing or unreadable (like os.walk, skip it); an empty root
+            # is reported by the caller as "no audio tracks"
+            log.debug("Skipping directory %s: %s", dir_path, exc)
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append((entry.path, os.path.join(subdir, entry.name) if subdir else entry.name))
+                    continue
+                # Check the name before is_file(): cover art, cue sheets etc.
+                # are rejected without touching the filesystem again
+                if entry.name.lower().endswith(VALID_AUDIO_EXTENSIONS) and entry.is_file():
+                    # One stat() per audio file on Linux/macOS, where scandir
+                    # only supplies the file type; Windows fills it in for free
+                    if entry.stat().st_size < MIN_AUDIO_FILE_SIZE:
+                        log.debug("Skipping tiny file %s", entry.path)
+                        continue
+                    yield entry.path, entry.name, subdir
+
+
+# Tag keys probed in order. With easy=True mutagen normalizes MP3/MP4 to the
+# lowercase names; Vorbis comments are case-insensitive; WAV still exposes raw
+# ID3 frame IDs, and the MP4 atom is kept in case easy mode isn't available.
+TITLE_TAG_KEYS = ('title', 'TIT2', '\xa9nam')
+ARTIST_TAG_KEYS = ('artist', 'TPE1', '\xa9ART')
+TRACKNUMBER_TAG_KEYS = ('tracknumber', 'TRCK')
+
+
+def first_tag_value(tags, keys):
+    """Return the first value found under any of `keys` as a string, else None."""
+    for key in keys:
+        # Single lookup: on mutagen's DictMixin tags `in` is a full __getitem__
+        try:
+            value = tags.get(key)
+        except ValueError:
+            # Vorbis comments reject keys that aren't valid field names (e.g. MP4's '\xa9nam')
+            continue
+        if value is not None:
+            # ID3 frames keep their values in .text; easy/Vorbis/MP4 tags are lists
+            value = getattr(value, 'text', value)
+            if isinstance(value, list):
+                if not value:
+                    continue
+                value = value[0]
+            return str(value)
+    return None
+
+
+# ---- Fast paths: read only the three fields we need straight off disk ----
+# mutagen decodes every frame (cover art, lyrics, TXXX...) just to hand us
+# title/artist/tracknumber. These readers walk the frame/block headers and
+# seek past everything else. They return None for anything unusual
+# (ID3v2.2, unsynchronisation, compressed frames...) and the caller falls
+# back to mutagen.
+_ID3_HEADER = struct.Struct(">3sBBBI")        # "ID3", major, revision, flags, size
+_ID3_FRAME_HEADER = struct.Struct(">4sIH")    # frame id, size, flags
+_ID3_FRAME_FIELDS = {b"TIT2": "title", b"TPE1": "artist", b"TRCK": "tracknumber"}
+_ID3_TEXT_ENCODINGS = ("latin-1", "utf-16", "utf-16-be", "utf-8")
+_BE_UINT32 = struct.Struct(">I")
+_LE_UINT32 = struct.Struct("<I")
+_VORBIS_FIELDS = {b"title": "title", b"artist": "artist", b"tracknumber": "tracknumber"}
+
+
+def _unsynchsafe(n):
+    """Decode a 28-bit ID3 'synchsafe' integer (7 bits per byte)."""
+    return (n & 0x7f) | ((n >> 1) & 0x3f80) | ((n >> 2) & 0x1fc000) | ((n >> 3) & 0xfe00000)
+
+
+def read_id3v2_fields(f):
+    """Read title/artist/tracknumber from a leading ID3v2.3/2.4 tag, or None."""
+    header = f.read(_ID3_HEADER.size)
+    if len(header) < _ID3_HEADER.size:
+        return None
+    magic, major, _revision, flags, size = _ID3_HEADER.unpack(header)
+    if magic != b"ID3" or major not in (3, 4) or flags & 0x80:  # 0x80 = unsynchronisation
+        return None
+    end = _ID3_HEADER.size + _unsynchsafe(size)
+
+    if flags & 0x40:  # extended header: v2.4 size includes itself, v2.3 doesn't
+        (ext_size,) = _BE_UINT32.unpack(f.read(4))
+        f.seek(_unsynchsafe(ext_size) - 4 if major == 4 else ext_size, 1)
+
+    found = {}
+    while len(found) < len(_ID3_FRAME_FIELDS) and f.tell() + _ID3_FRAME_HEADER.size <= end:
+        frame_id, frame_size, frame_flags = _ID3_FRAME_HEADER.unpack(f.read(_ID3_FRAME_HEADER.size))
+        if frame_id[0] == 0:  # hit the padding
+            break
+        if major == 4:
+            frame_size = _unsynchsafe(frame_size)
+        field = _ID3_FRAME_FIELDS.get(frame_id)
+        if field is None or field in found:
+            f.seek(frame_size, 1)
+            continue
+        if frame_flags & 0xff:  # compression/encryption/grouping/etc.
+            return None
+        if frame_size > end - f.tell():  # runs past the tag: leave it to mutagen
+            return None
+        payload = f.read(frame_size)
+        if not payload or payload[0] >= len(_ID3_TEXT_ENCODINGS):
+            return None
+        text = payload[1:].decode(_ID3_TEXT_ENCODINGS[payload[0]])
+        if text.strip("\x00"):  # mutagen treats an empty frame as no value
+            # Multiple values are NUL-separated; keep the first
+            found[field] = text.split("\x00", 1)[0]
+    if len(found) < len(_ID3_FRAME_FIELDS):
+        # mutagen fills fields the v2 tag lacks from an ID3v1 trailer
+        file_size = f.seek(0, os.SEEK_END)
+        if file_size >= 128:
+            f.seek(file_size - 128)
+            if f.read(3) == b"TAG":
+                return None
+    return found
+
+
+def read_flac_vorbis_fields(f):
+    """Read title/artist/tracknumber from a FLAC file's VORBIS_COMMENT block, or None."""
+    if f.read(4) != b"fLaC":
+        return None
+    while True:
+        block_header = f.read(4)
+        if len(block_header) < 4:
+            return None
+        is_last, block_type = block_header[0] & 0x80, block_header[0] & 0x7f
+        length = int.from_bytes(block_header[1:], "big")
+        if block_type == 4:  # VORBIS_COMMENT
+            return _parse_vorbis_comment(f.read(length))
+        if is_last:
+            return {}
+        f.seek(length, 1)
+
+
+def _parse_vorbis_comment(data):
+    (vendor_length,) = _LE_UINT32.unpack_from(data, 0)
+    pos = 4 + vendor_length
+    (count,) = _LE_UINT32.unpack_from(data, pos)
+    pos += 4
+    found = {}
+    for _ in range(count):
+        (length,) = _LE_UINT32.unpack_from(data, pos)
+        pos += 4
+        key, _, value = data[pos:pos + length].partition(b"=")
+        pos += length
+        field = _VORBIS_FIELDS.get(key.lower())
+        if field is not None and field not in found:
+            found[field] = value.decode("utf-8", "replace")
+    return found
+
+
+# Once the container is sniffed, open it with the matching mutagen class
+# directly and skip MutagenFile's score-every-format probing.
+def open_mp3_tags(f):
+    """
+    EasyID3 on its own: reads the ID3v2 tag (or ID3v1 trailer) without
+    EasyMP3's scan of the MPEG stream for bitrate/length. None if untagged.
+    """
+    try:
+        return EasyID3(f)
+    except ID3NoHeaderError:
+        return None
+
+
+TAG_OPENERS = {
+    "mp3": open_mp3_tags,
+    "flac": FLAC,
+    "mp4": EasyMP4,
+    "ogg": OggVorbis,
+    "wav": WAVE,
+}
+
+# Other codecs that share a sniffed container, tried (and only these) if the
+# primary opener rejects the file, instead of MutagenFile's ~25-format probe.
+FALLBACK_TAG_OPENERS = {
+    "ogg": [OggOpus, OggFLAC, OggSpeex],
+}
+
+FAST_TAG_READERS = {
+    "mp3": read_id3v2_fields,
+    "flac": read_flac_vorbis_fields,
+}
+
+_RIFF_CHUNK_HEADER = struct.Struct("<4sI")
+
+
+def _id3v2_tag_size(header):
+    """Total bytes taken by the ID3v2 tag whose 10-byte header starts `header` (footer included)."""
+    _magic, _major, _revision, flags, size = _ID3_HEADER.unpack_from(header)
+    return _ID3_HEADER.size * (2 if flags & 0x10 else 1) + _unsynchsafe(size)
+
+
+def sniff_audio_format(header):
+    """Identify a container from a file's first 12 bytes: a TAG_OPENERS key, or None."""
+    if header.startswith(b"ID3"):
+        return "mp3"
+    if header.startswith(b"fLaC"):
+        return "flac"
+    if header.startswith(b"OggS"):
+        return "ogg"
+    if header.startswith(b"RIFF") and header[8:12] == b"WAVE":
+        return "wav"
+    if header[4:8] == b"ftyp":
+        return "mp4"
+    if len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0:
+        # Bare MPEG frame sync: no ID3v2, but there may be an ID3v1 tag at the end
+        return "mp3"
+    return None
+
+
+def _wav_has_id3_chunk(f):
+    """Walk RIFF chunk headers (f positioned just past 'RIFF....WAVE') looking for ID3 tags."""
+    while True:
+        chunk = f.read(_RIFF_CHUNK_HEADER.size)
+        if len(chunk) < _RIFF_CHUNK_HEADER.size:
+            return False
+        chunk_id, chunk_size = _RIFF_CHUNK_HEADER.unpack(chunk)
+        if chunk_id.lower() == b"id3 ":
+            return True
+        f.seek(chunk_size + (chunk_size & 1), 1)  # chunks are word-aligned
+
+
+def read_mutagen_fields(f, opener, fallbacks=(), sniffed=True):
+    """
+    Slow path: let mutagen parse the tags, then probe the three fields we need.
+    `sniffed` is False when the format is only a guess (e.g. from the file
+    extension); if the guess yields nothing, every mutagen format is tried.
+    """
+    try:
+        try:
+            audio = opener(f)
+        except MutagenError:
+            # Header looked right but the class disagrees (e.g. Opus in Ogg).
+            # A container identified by its own magic with no sibling codecs
+            # can't be anything else, so there's nothing left to try.
+            if sniffed and not fallbacks:
+                return {}
+            audio = None
+        if audio is None and (fallbacks or not sniffed):
+            # Let mutagen pick among the container's other codecs, or among
+            # all of them when the container was only guessed
+            f.seek(0)
+            audio = MutagenFile(f, options=fallbacks if sniffed else None)
+    except MutagenError:
+        return {}
+    # FileType objects hold their tags in .tags; EasyID3 already is the tags.
+    # Probe the tag object directly rather than copying every frame
+    # (embedded art included) into a dict.
+    tags = getattr(audio, "tags", audio)
+    if not tags:
+        return {}
+
+    return {
+        "title": first_tag_value(tags, TITLE_TAG_KEYS),
+        "artist": first_tag_value(tags, ARTIST_TAG_KEYS),
+        "tracknumber": first_tag_value(tags, TRACKNUMBER_TAG_KEYS),
+    }
 
 
 def extract_tags_from_file(file_path):
@@ -108,56 +782,115 @@ def extract_tags_from_file(file_path):
         "artist": None,
         "tracknumber": None,
     }
-    audio = MutagenFile(file_path)
-    if not audio or not audio.tags:
+    try:
+        # One 64 KiB read covers the header and, for almost every file, the
+        # whole tag block, so the readers' small reads/seeks come from memory
+        # instead of a syscall per 8 KiB buffer refill.
+        with open(file_path, "rb", buffering=TAG_READ_BUFFER_SIZE) as f:
+            # Sniff the magic bytes first so files that can't carry tags (or
+            # aren't audio at all) never reach mutagen.
+            header = f.read(12)
+            fmt = sniff_audio_format(header)
+            start = 0
+            sniffed = fmt is not None
+            if fmt == "mp3" and header.startswith(b"ID3") and len(header) >= _ID3_HEADER.size:
+                # FLAC can carry an ID3v2 tag in front of 'fLaC' too: look past it
+                start = _id3v2_tag_size(header)
+                f.seek(start)
+                inner = sniff_audio_format(f.read(12))
+                if inner == "flac":
+                    fmt = "flac"
+                else:
+                    # Only an MPEG frame sync after the tag confirms mp3
+                    start, sniffed = 0, inner == "mp3"
+            elif fmt is None and file_path.lower().endswith(".mp3"):
+                # Padding or junk before the first MPEG frame hides the sync;
+                # the walk only hands us known extensions, so trust the name
+                fmt = "mp3"
+            if fmt is None or (fmt == "wav" and not _wav_has_id3_chunk(f)):
+                return audio_data
+
+            fields = None
+            fast_reader = FAST_TAG_READERS.get(fmt)
+            if fast_reader is not None:
+                f.seek(start)
+                try:
+                    fields = fast_reader(f)
+                except (struct.error, UnicodeDecodeError):
+                    fields = None
+            if fields is None:
+                f.seek(0)
+                fields = read_mutagen_fields(f, TAG_OPENERS[fmt], FALLBACK_TAG_OPENERS.get(fmt, ()), sniffed)
+    except OSError:
+        # Unreadable file: fall back to filename-derived metadata
         return audio_data
 
-    tags = dict(audio.tags)
+    audio_data.update(fields)
+    if audio_data['tracknumber'] is not None:
+        audio_data['tracknumber'] = audio_data['tracknumber'].split('/')[0]
+    return audio_data
 
-    for key in ['TIT2', 'TITLE', '\xa9nam']:
-        if key in tags:
-            audio_data['title'] = str(tags[key])
-            break
 
-    for key in ['TPE1', 'ARTIST', '\xa9ART']:
-        if key in tags:
-            audio_data['artist'] = str(tags[key])
-            break
+class Track:
+    """One local audio file and its tag metadata (slotted: no per-instance dict)."""
+    __slots__ = ('full_path', 'subdir', 'filename', 'title', 'artist', 'tracknumber', 'tracknumber_int')
 
-    for key in ['TRCK', 'TRACKNUMBER']:
-        if key in tags:
-            raw = str(tags[key])
-            audio_data['tracknumber'] = raw.split('/')[0]
-            break
+    def __init__(self, full_path, subdir, filename, title, artist, tracknumber):
+        self.full_path = full_path
+        self.subdir = subdir
+        self.filename = filename
+        self.title = title
+        self.artist = artist
+        self.tracknumber = tracknumber
+        # Parsed once here so sorting never has to re-parse (missing/bogus => last).
+        # isdecimal() (exactly what int() accepts as digits) instead of
+        # try/except: untagged and odd tracknumbers are common, and raising
+        # ValueError for each costs far more than a branch.
+        raw = tracknumber.strip() if tracknumber else ""
+        self.tracknumber_int = int(raw) if raw.isdecimal() else 9999
 
-    return audio_data
+    def __repr__(self):
+        return f"Track({self.subdir!r}, {self.filename!r}, title={self.title!r})"
 
 
-def gather_all_local_tracks(root_directory):
-    """Find all valid audio files under root_directory and parse track metadata."""
+def gather_all_local_tracks(root_directory, workers=None):
+    """
+    Find all valid audio files under root_directory and parse track metadata.
+    `workers` caps concurrent tag reads (default: 4 per CPU); 1 reads serially.
+    """
     root_directory = os.path.abspath(root_directory)
     all_tracks = []
 
-    for audio_path in find_audio_files_recursively(root_directory):
-        rel_path = os.path.relpath(audio_path, root_directory)
-        subdir = os.path.dirname(rel_path) or ""
-        if subdir == ".":
-            subdir = ""
+    # Enumerate first, then read tags concurrently. Parsing is cheap with the
+    # fast header readers, so tag reading is dominated by per-file I/O and a
+    # thread pool overlaps the waits.
+    audio_files = list(find_audio_files_recursively(root_directory))
+    audio_paths = [path for path, _, _ in audio_files]
+    if workers == 1:
+        # e.g. spinning disks, where concurrent reads just add seeks
+        all_meta = [extract_tags_from_file(path) for path in audio_paths]
+    else:
+        with ThreadPoolExecutor(max_workers=workers or (os.cpu_count() or 1) * 4) as executor:
+            all_meta = list(executor.map(extract_tags_from_file, audio_paths))
 
-        meta = extract_tags_from_file(audio_path)
+    for (audio_path, filename, subdir), meta in zip(audio_files, all_meta):
         if not meta['title']:
-            meta['title'] = os.path.splitext(os.path.basename(audio_path))[0]
-
-        track_info = {
-            "full_path": audio_path,
-            "subdir": subdir,
-            "filename": os.path.basename(audio_path),
-            "title": meta["title"],
-            "artist": meta["artist"],
-            "tracknumber": meta["tracknumber"],
-        }
-        all_tracks.append(track_info)
-
+            meta['title'] = os.path.splitext(filename)[0]
+
+        artist = meta["artist"]
+        all_tracks.append(Track(
+            full_path=audio_path,
+            # Subdir and artist repeat across most of an album's tracks; keep one copy of each
+            subdir=sys.intern(subdir),
+            filename=filename,
+            title=meta["title"],
+            artist=sys.intern(artist) if artist is not None else None,
+            tracknumber=meta["tracknumber"],
+        ))
+
+    # Keep output deterministic regardless of walk order. This is also the
+    # diff's display order (disc folder, then track #), so it's sorted only here.
+    all_tracks.sort(key=attrgetter("subdir", "tracknumber_int", "filename"))
     return all_tracks
 
 
@@ -165,77 +898,119 @@ def gather_all_local_tracks(root_directory):
 # 4) MusicBrainz Lookup + Diff
 # ---------------------------------------------------------------------------
 def get_mb_release_total_tracks(mb_release):
-    """Return total # tracks across all mediums for a single MB release."""
+    """
+    Return total # tracks across all mediums for a single MB release.
+    Search hits carry the total as 'medium-track-count'. Otherwise sum each
+    medium's 'track-count' (the parsed track-list count attribute), only
+    counting the track list itself when that's missing.
+    """
+    if 'medium-track-count' in mb_release:
+        return mb_release['medium-track-count']
     total = 0
     for medium in mb_release.get('medium-list', []):
-        track_list = medium.get('track-list', [])
-        total += len(track_list)
+        count = medium.get('track-count')
+        total += count if count is not None else len(medium.get('track-list', ()))
     return total
 
 
+def has_track_count(mb_release):
+    """True if get_mb_release_total_tracks can count this release without a track list."""
+    if 'medium-track-count' in mb_release:
+        return True
+    media = mb_release.get('medium-list')
+    return bool(media) and all('track-count' in medium for medium in media)
+
+
+def flatten_artist_credit(artist_credit, default):
+    """
+    Join an MB artist-credit list (artist dicts interleaved with join-phrase
+    strings) into one display string, or `default` if it names nobody.
+    """
+    names = [
+        credit if isinstance(credit, str) else credit["artist"]["name"]
+        for credit in artist_credit
+        if isinstance(credit, str) or "artist" in credit
+    ]
+    return " & ".join(names) if names else default
+
+
 def get_best_release_for_rg(rg_releases, local_track_count):
     """
     Given multiple releases for the same release group,
     pick the single release whose track count is *closest* to local_track_count.
     Return (release_dict, diff).
     """
-    best = None
-    best_diff = None
-    for r in rg_releases:
-        count = get_mb_release_total_tracks(r)
-        diff = abs(count - local_track_count)
-        if best is None or diff < best_diff:
-            best = r
-            best_diff = diff
+    # min() keeps the first of equally close releases, i.e. MB's search order
+    diffs = [(abs(get_mb_release_total_tracks(r) - local_track_count), r) for r in rg_releases]
+    best_diff, best = min(diffs, key=itemgetter(0))
     return best, best_diff
 
 
-def find_best_release_group(artist_name, album_name, local_track_count):
+def rank_release_groups(artist_name, album_name, local_track_count):
     """
-    1) Search MusicBrainz for up to 10 releases matching artist_name + album_name.
-    2) Bucket them by release-group ID.
-    3) For each group, find the release that has the track count closest to local_track_count.
-    4) Pick the group that yields the smallest difference. If there's a tie, ask user to choose.
-    5) Return (best_release, best_release_group) or (None, None).
+    The network-bound half of find_best_release_group: search and bucket
+    releases by release-group, then return a list of
+    (rgid, best_release_in_rg, best_diff_in_rg, release_group_dict)
+    sorted by best_diff ascending (empty if nothing was found).
 
-    'best_release' is the specific release we'll compare side-by-side.
-    'best_release_group' is just the RG dictionary if we want it for reference.
+    The releases are search hits where possible, so they lack tracklists;
+    use load_full_release() on whichever one gets picked.
     """
+    mb = get_musicbrainzngs()
+
     # Step 1: search
-    if not artist_name:
-        result = musicbrainzngs.search_releases(release=album_name, limit=10)
-    else:
-        result = musicbrainzngs.search_releases(artist=artist_name, release=album_name, limit=10)
+    result = mb_search_releases(artist_name, album_name)
     found = result.get('release-list', [])
     if not found:
-        return None, None
+        return []
+
+    # Search hits already carry the release-group and track counts (total
+    # and per medium), which is all the ranking needs, so only the chosen
+    # release gets a full fetch later. Hits missing both counts are fetched
+    # here, concurrently; mb_client's rate limiter still decides when each
+    # request may go out.
+    def fetch(r):
+        try:
+            return mb_get_release(r['id'])["release"]
+        except mb.WebServiceError:
+            return None
+
+    def rg_id(r):
+        return (r.get("release-group") or {}).get("id")
+
+    # A group that already has an exact match can't improve, so its
+    # count-less hits aren't worth a request.
+    exact_rgs = {
+        rg_id(r) for r in found
+        if rg_id(r) and has_track_count(r) and get_mb_release_total_tracks(r) == local_track_count
+    }
+    releases = list(found)
+    missing = []
+    for i, r in enumerate(found):
+        if not has_track_count(r):
+            if rg_id(r) in exact_rgs:
+                releases[i] = None
+            else:
+                missing.append(i)
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(len(missing), MB_MAX_CONCURRENCY)) as executor:
+            for i, release_data in zip(missing, executor.map(fetch, [found[i] for i in missing])):
+                releases[i] = release_data
 
-    # We'll fetch the full data for each release (including tracklists).
     # Group them by release-group ID => { rgid: [release_dicts], ... }
     groups = {}  # { rgid -> list of release_dicts }
-    release_info = []
-    for r in found:
-        rid = r['id']
-        try:
-            full = musicbrainzngs.get_release_by_id(
-                rid,
-                includes=["artist-credits", "recordings", "release-groups", "labels", "url-rels"]
-            )
-            release_data = full["release"]
-            # Extract RG ID
-            rg = release_data.get("release-group")
-            if not rg or "id" not in rg:
-                # Possibly skip if no RG?
-                # We'll treat "no RG" as distinct ID so we can store it anyway
-                rgid = "NO_RG_" + rid  # or something unique
-            else:
-                rgid = rg["id"]
-            groups.setdefault(rgid, []).append(release_data)
-        except musicbrainzngs.WebServiceError:
+    for r, release_data in zip(found, releases):
+        if release_data is None:
             continue
-
-    if not groups:
-        return None, None
+        # Extract RG ID
+        rg = release_data.get("release-group")
+        if not rg or "id" not in rg:
+            # Possibly skip if no RG?
+            # We'll treat "no RG" as distinct ID so we can store it anyway
+            rgid = "NO_RG_" + r['id']  # or something unique
+        else:
+            rgid = rg["id"]
+        groups.setdefault(rgid, []).append(release_data)
 
     # Step 2: For each RG, find best release for local track count
     rg_candidates = []  # list of (rgid, best_release_in_rg, best_diff_in_rg, release_group_dict)
@@ -247,6 +1022,51 @@ def find_best_release_group(artist_name, album_name, local_track_count):
 
     # Step 3: sort by best_diff ascending
     rg_candidates.sort(key=lambda x: x[2])  # compare on best_diff
+    return rg_candidates
+
+
+def load_full_release(release, rg_dict):
+    """Fetch the complete release (tracklists, URL rels...) for a ranked candidate."""
+    full = mb_get_release(release['id'])["release"]
+    return full, full.get("release-group") or rg_dict
+
+
+def prefetch_release_lookups(albums):
+    """
+    Resolve the MusicBrainz lookups for many albums concurrently so the
+    interactive per-album pass afterwards is served from the caches.
+    mb_client's rate limiter still paces the requests that actually go out.
+    """
+    mb = get_musicbrainzngs()
+
+    def warm(local_data):
+        try:
+            rg_candidates = rank_release_groups(local_data["artist"], local_data["album"], len(local_data["tracks"]))
+            if rg_candidates:
+                # The top candidate is almost always the one that gets diffed
+                load_full_release(rg_candidates[0][1], rg_candidates[0][3])
+        except mb.WebServiceError as exc:
+            # The interactive pass will retry (and report) this one
+            log.debug("Prefetch failed for %r: %s", local_data["album"], exc)
+
+    with ThreadPoolExecutor(max_workers=MB_MAX_CONCURRENCY) as executor:
+        list(executor.map(warm, albums))
+
+
+def find_best_release_group(artist_name, album_name, local_track_count):
+    """
+    1) Search MusicBrainz for up to 10 releases matching artist_name + album_name.
+    2) Bucket them by release-group ID.
+    3) For each group, find the release that has the track count closest to local_track_count.
+    4) Pick the group that yields the smallest difference. If there's a tie, ask user to choose.
+    5) Return (best_release, best_release_group) or (None, None).
+
+    'best_release' is the specific release we'll compare side-by-side.
+    'best_release_group' is just the RG dictionary if we want it for reference.
+    """
+    rg_candidates = rank_release_groups(artist_name, album_name, local_track_count)
+    if not rg_candidates:
+        return None, None
 
     # The top item(s) have the minimal difference
     min_diff = rg_candidates[0][2]
@@ -255,7 +1075,7 @@ def find_best_release_group(artist_name, album_name, local_track_count):
     if len(best_list) == 1:
         # Exactly one best RG
         rgid, best_rel, best_diff, rg_dict = best_list[0]
-        return best_rel, rg_dict
+        return load_full_release(best_rel, rg_dict)
     else:
         # We have multiple groups with the same difference. Prompt user to choose
         print(f"\nFound {len(best_list)} release groups with the same track-count difference={min_diff}:")
@@ -267,15 +1087,7 @@ def find_best_release_group(artist_name, album_name, local_track_count):
             ccount = get_mb_release_total_tracks(best_rel)
             rel_title = best_rel.get("title", "(No release title)")
             rid = best_rel.get("id")
-            # flatten artist credits
-            ac_credits = best_rel.get("artist-credit", [])
-            ac_names = []
-            for cred in ac_credits:
-                if isinstance(cred, dict) and 'artist' in cred:
-                    ac_names.append(cred['artist']['name'])
-                elif isinstance(cred, str):
-                    ac_names.append(cred)
-            ac_joined = " & ".join(ac_names) if ac_names else "(Unknown Artist)"
+            ac_joined = flatten_artist_credit(best_rel.get("artist-credit", ()), "(Unknown Artist)")
 
             print(f"{i}) RG: {rgid} '{rg_title}' => Release: {ac_joined} - {rel_title} [MBID={rid}] (Tracks={ccount})")
 
@@ -287,32 +1099,60 @@ def find_best_release_group(artist_name, album_name, local_track_count):
                 idx = int(choice)
                 if 1 <= idx <= len(best_list):
                     sel = best_list[idx - 1]
-                    return sel[1], sel[3]  # best_rel, rg_dict
+                    return load_full_release(sel[1], sel[3])  # best_rel, rg_dict
             except ValueError:
                 pass
             print("Invalid choice. Try again.")
 
 
+def summarize_album_match(local_data):
+    """
+    Non-interactive counterpart of find_best_release_group for --batch.
+    Returns (ok, one-line summary): OK only for a single exact-count match.
+    """
+    root = local_data["root_directory"]
+    mb = get_musicbrainzngs()
+    try:
+        rg_candidates = rank_release_groups(local_data["artist"], local_data["album"], len(local_data["tracks"]))
+    except mb.WebServiceError as exc:
+        return False, f"ERROR {root} ({exc})"
+    if not rg_candidates:
+        return False, f"MISS {root}"
+
+    min_diff = rg_candidates[0][2]
+    tied = sum(1 for c in rg_candidates if c[2] == min_diff)
+    if min_diff == 0 and tied == 1:
+        return True, f"OK {root} mbid={rg_candidates[0][1]['id']} diff=0"
+    return False, f"AMBIG {root} n={tied} diff={min_diff}"
+
+
+_SEP = "-" * 120
+_EQ = "=" * 120
+_RELEASE_HEADER = (_EQ, "RELEASE-LEVEL COMPARISON", _EQ)
+_TRACK_HEADER = (_EQ, "TRACK-BY-TRACK COMPARISON", _EQ)
+_NO_LOCAL_TRACK = ("(No local track)", "", "", "")
+_NO_MB_TRACK = ("(No MB track)", "", "", "")
+
+
 def side_by_side_format(lines_left, lines_right, left_width=60, unify_if_identical=True):
     """
     If lines match and are not empty, show "== line".
     Else side-by-side: left|right.
+    Yields one output line at a time.
     """
-    output = []
-    max_len = max(len(lines_left), len(lines_right))
-    for i in range(max_len):
-        l = lines_left[i] if i < len(lines_left) else ""
-        r = lines_right[i] if i < len(lines_right) else ""
+    for l, r in zip_longest(lines_left, lines_right, fillvalue=""):
         if unify_if_identical and l.strip() and (l == r):
-            output.append(f"== {l}")
+            yield f"== {l}"
         else:
-            output.append(f"{l:<{left_width}} | {r}")
-    return output
+            # ljust is a plain C call; a nested {l:<{w}} spec is re-parsed every line
+            yield f"{l.ljust(left_width)} | {r}"
 
 
 def generate_side_by_side_diff(local_data, mb_data):
     """
     Show a release-level and track-level diff between local_data and mb_data (a single MB release).
+    This is a generator: lines are yielded as they're produced so callers can
+    stream them out without holding the whole diff in memory.
     """
     local_artist = local_data["artist"] or "Unknown Local Artist"
     local_album = local_data["album"] or "Unknown Local Album"
@@ -323,13 +1163,7 @@ def generate_side_by_side_diff(local_data, mb_data):
     ]
 
     mb_rlines = []
-    mb_artists = []
-    for credit in mb_data.get('artist-credit', []):
-        if isinstance(credit, dict) and "artist" in credit:
-            mb_artists.append(credit["artist"]["name"])
-        elif isinstance(credit, str):
-            mb_artists.append(credit)
-    joined = " & ".join(mb_artists) if mb_artists else "Unknown MB Artist"
+    joined = flatten_artist_credit(mb_data.get('artist-credit', ()), "Unknown MB Artist")
     mb_rlines.append(f"Artist: {joined}")
 
     mb_album = mb_data.get("title", "Unknown MB Album")
@@ -345,83 +1179,70 @@ def generate_side_by_side_diff(local_data, mb_data):
         mb_rlines.append(f" - {rtype}: {tgt}")
 
     # Release-level diff
-    release_diff = side_by_side_format(local_rlines, mb_rlines, 60, True)
+    yield from _RELEASE_HEADER
+    yield from side_by_side_format(local_rlines, mb_rlines, 60, True)
+    yield ""
 
     # Track-level
-    mb_tracks = []
-    for medium in mb_data.get('medium-list', []):
-        for track in medium.get('track-list', []):
-            rec = track.get('recording', {})
-            mbid = rec.get('id')
-            track_uri = f"https://musicbrainz.org/recording/{mbid}" if mbid else None
-            artist_phrase = rec.get('artist-credit-phrase', "")
-            mb_tracks.append({
-                "position": track.get("position"),
-                "title": rec.get("title", ""),
-                "uri": track_uri,
-                "artist": artist_phrase
-            })
-
-    # Sort local
-    def track_sort_key(t):
-        try:
-            num = int(t["tracknumber"]) if t["tracknumber"] else 9999
-        except ValueError:
-            num = 9999
-        return (t["subdir"], num)
-
-    sorted_local = sorted(local_data["tracks"], key=track_sort_key)
-    track_lines = []
-    max_t = max(len(sorted_local), len(mb_tracks))
-
-    for i in range(max_t):
-        if i < len(sorted_local):
-            lt = sorted_local[i]
-            fname = lt["filename"]
-            if lt["subdir"]:
-                fname = f"{lt['subdir']}/{fname}"
-            ln = lt["tracknumber"] or ""
-            ltitle = lt["title"] or ""
-            lartist = lt["artist"] or ""
-            left_chunk = [
+    # One flat comprehension over all media; () defaults avoid allocating
+    # empty lists for missing keys.
+    mb_tracks = [
+        {
+            "position": track.get("position"),
+            "title": rec.get("title", ""),
+            "uri": f"https://musicbrainz.org/recording/{rec['id']}" if rec.get('id') else None,
+            # Compilations repeat the same credit many times; share one string
+            "artist": sys.intern(rec.get('artist-credit-phrase', "")),
+        }
+        for medium in mb_data.get('medium-list', ())
+        for track in medium.get('track-list', ())
+        for rec in (track.get('recording') or {},)
+    ]
+
+    # gather_all_local_tracks already ordered these by (subdir, track #)
+    sorted_local = local_data["tracks"]
+    log.debug("Diffing %d local tracks against %d MB tracks", len(sorted_local), len(mb_tracks))
+    yield from _TRACK_HEADER
+
+    for lt, mt in zip_longest(sorted_local, mb_tracks):
+        if lt is not None:
+            fname = lt.filename
+            if lt.subdir:
+                fname = f"{lt.subdir}/{fname}"
+            ln = lt.tracknumber or ""
+            ltitle = lt.title or ""
+            lartist = lt.artist or ""
+            left_chunk = (
                 f"File:    {fname}",
                 f"Track#:  {ln}",
                 f"Title:   {ltitle}",
                 f"Artist:  {lartist}"
-            ]
+            )
         else:
-            left_chunk = ["(No local track)", "", "", ""]
+            left_chunk = _NO_LOCAL_TRACK
 
-        if i < len(mb_tracks):
-            mt = mb_tracks[i]
+        if mt is not None:
             muri = mt["uri"] or "(no MB URI)"
             mn = mt["position"] or ""
             mtitle = mt["title"] or ""
             martist = mt["artist"] or ""
-            right_chunk = [
+            right_chunk = (
                 f"URI:     {muri}",
                 f"Track#:  {mn}",
                 f"Title:   {mtitle}",
                 f"Artist:  {martist}"
-            ]
+            )
         else:
-            right_chunk = ["(No MB track)", "", "", ""]
+            right_chunk = _NO_MB_TRACK
 
-        chunk = side_by_side_format(left_chunk, right_chunk, 60, True)
-        track_lines.extend(chunk)
-        track_lines.append("-" * 120)
-
-    out = []
-    out.append("=" * 120)
-    out.append("RELEASE-LEVEL COMPARISON")
-    out.append("=" * 120)
-    out.extend(release_diff)
-    out.append("")
-    out.append("=" * 120)
-    out.append("TRACK-BY-TRACK COMPARISON")
-    out.append("=" * 120)
-    out.extend(track_lines)
-    return "\n".join(out)
+        # side_by_side_format inlined: both chunks are always 4 lines, so
+        # there's nothing to pad and no per-track generator to set up.
+        for l, r in zip(left_chunk, right_chunk):
+            if l == r and l.strip():
+                yield f"== {l}"
+            else:
+                yield f"{l.ljust(60)} | {r}"
+        yield _SEP
 
 
 # ---------------------------------------------------------------------------
@@ -467,24 +1288,11 @@ def open_release_edit_page(release_mbid):
 # ---------------------------------------------------------------------------
 # 6) Main
 # ---------------------------------------------------------------------------
-def main():
-    args = parse_args()
-    root_dir = args.root_directory
-    base_name = os.path.basename(os.path.normpath(root_dir))
-    guessed_artist, guessed_album = guess_artist_and_album_from_directory(base_name)
-
-    # 1) Gather local tracks
-    local_tracks = gather_all_local_tracks(root_dir)
-    if not local_tracks:
-        print(f"No audio tracks found in '{root_dir}'. Aborting.")
-        sys.exit(1)
-
-    local_data = {
-        "artist": guessed_artist,
-        "album": guessed_album,
-        "tracks": local_tracks
-    }
-    local_track_count = len(local_tracks)
+def process_album(local_data):
+    """Diff one album against its best MB match and offer the follow-up edits."""
+    guessed_artist = local_data["artist"]
+    guessed_album = local_data["album"]
+    local_track_count = len(local_data["tracks"])
 
     # 2) Find best matching release-group (and best release in that group)
     best_release, rg_dict = find_best_release_group(guessed_artist, guessed_album, local_track_count)
@@ -494,12 +1302,15 @@ def main():
         if prompt_yes_no("No MB release group. Do you want to create a NEW Release Group?"):
             artist_mbid = input("Enter the Artist MBID (e.g. f4353d58-79ee-...)? ").strip()
             rg_name = guessed_album or "New ReleaseGroup"
+            forget_cached_lookups(guessed_artist, guessed_album)
             create_release_group_on_musicbrainz(artist_mbid, rg_name, primary_type_id=1)
-        sys.exit(0)
+        return
 
     # 3) Show the side-by-side diff for that release
-    diff_text = generate_side_by_side_diff(local_data, best_release)
-    print(diff_text)
+    write = sys.stdout.write
+    for line in generate_side_by_side_diff(local_data, best_release):
+        write(line)
+        write("\n")
 
     # 4) Check if the release-group is set, or we might create one
     if rg_dict and "id" in rg_dict:
@@ -511,6 +1322,7 @@ def main():
         if prompt_yes_no("\nNo Release Group assigned. Do you want to create a new Release Group?"):
             artist_mbid = input("Artist MBID for the new release-group? ").strip()
             rg_name = guessed_album or "New RG"
+            forget_cached_lookups(guessed_artist, guessed_album, best_release.get("id"))
             create_release_group_on_musicbrainz(artist_mbid, rg_name, primary_type_id=1)
 
     # 5) If local has more tracks than MB, offer to open the release edit page
@@ -522,9 +1334,75 @@ def main():
                "NOTE: This is recommended ONLY if the official release truly matches your local version.\n"
                "Open release edit page now")
         if rid and prompt_yes_no(msg):
+            forget_cached_lookups(guessed_artist, guessed_album, rid)
             open_release_edit_page(rid)
 
+
+def main():
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format="%(levelname)s %(name)s: %(message)s",
+    )
+    if args.no_cache:
+        disable_response_cache()
+    get_response_cache().ttl = args.cache_ttl * 86400
+
+    # 1) Gather local tracks for every album up front
+    albums = []
+    # --batch reports empty directories alongside the lookups, in argument order
+    batch_order = []
+    missing = False
+    for root_dir in args.root_directories:
+        local_tracks = gather_all_local_tracks(root_dir, workers=args.scan_workers)
+        if not local_tracks:
+            if args.batch:
+                batch_order.append((False, f"MISS {root_dir} (no audio files)"))
+            else:
+                print(f"No audio tracks found in '{root_dir}'. Skipping.")
+            missing = True
+            continue
+        base_name = os.path.basename(os.path.normpath(root_dir))
+        guessed_artist, guessed_album = guess_artist_and_album_from_directory(base_name)
+        albums.append({
+            "root_directory": root_dir,
+            "artist": guessed_artist,
+            "album": guessed_album,
+            "tracks": local_tracks
+        })
+        batch_order.append(None)
+
+    if args.batch:
+        # Lookups run concurrently (the shared rate limiter still paces them);
+        # results are printed in argument order.
+        with ThreadPoolExecutor(max_workers=MB_MAX_CONCURRENCY) as executor:
+            looked_up = executor.map(summarize_album_match, albums)
+            results = [entry or next(looked_up) for entry in batch_order]
+        for ok, line in results:
+            print(line)
+        sys.exit(0 if all(ok for ok, _ in results) else 1)
+    if not albums:
+        sys.exit(1)
+
+    # With several albums, resolve all their MB lookups concurrently first;
+    # the interactive pass below then reads from the caches.
+    if len(albums) > 1:
+        prefetch_release_lookups(albums)
+
+    mb = get_musicbrainzngs()
+    for local_data in albums:
+        if len(albums) > 1:
+            print(f"\n{_EQ}\nAlbum directory: {local_data['root_directory']}")
+        try:
+            process_album(local_data)
+        except mb.WebServiceError as exc:
+            # One unreachable lookup shouldn't cost the user the rest of the albums
+            print(f"MusicBrainz lookup failed for '{local_data['root_directory']}': {exc}")
+            missing = True
+
     print("\nDone. Exiting.")
+    if missing:
+        sys.exit(1)
 
 
 if __name__ == "__main__":